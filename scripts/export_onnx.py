@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+OCR Skill - Export fast-mode models to ONNX
+One-time conversion of the PP-OCRv4 mobile det/rec models so
+`ocr.py --fast --hpi` can run them with ONNXRuntime (CPU) or build
+TensorRT engines from them (GPU).
+
+Usage:
+  paddlex --install paddle2onnx       # One-time plugin install
+  python ocr.py image.png --fast      # Downloads the Paddle models
+  python export_onnx.py
+"""
+
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from ocr import FAST_DET_MODEL, FAST_REC_MODEL, ONNX_MODEL_DIR  # noqa: E402
+
+# Where PaddleOCR/PaddleX downloads official models
+PADDLEX_MODEL_DIR = Path(
+    os.environ.get("PADDLE_PDX_CACHE_HOME", Path.home() / ".paddlex")
+) / "official_models"
+
+
+def export_model(name: str, output_dir: Path, opset_version: int) -> bool:
+    """Convert one downloaded Paddle model to ONNX with paddlex --paddle2onnx."""
+    paddle_dir = PADDLEX_MODEL_DIR / name
+    onnx_dir = output_dir / name
+    if not paddle_dir.exists():
+        print(f"[FAIL] {name}: Paddle model not found in {PADDLEX_MODEL_DIR}")
+        print("       Run once to download it: python ocr.py image.png --fast")
+        return False
+    if (onnx_dir / "inference.onnx").exists():
+        print(f"[OK] {name}: already exported to {onnx_dir}")
+        return True
+
+    print(f"Exporting {name}...", flush=True)
+    try:
+        result = subprocess.run(
+            ["paddlex", "--paddle2onnx",
+             "--paddle_model_dir", str(paddle_dir),
+             "--onnx_model_dir", str(onnx_dir),
+             "--opset_version", str(opset_version)],
+            capture_output=True,
+            text=True
+        )
+    except FileNotFoundError:
+        print("[FAIL] paddlex not found. Install with: pip install paddleocr")
+        return False
+    if result.returncode != 0 or not (onnx_dir / "inference.onnx").exists():
+        print(f"[FAIL] {name}: export failed")
+        print(result.stderr.strip() or result.stdout.strip())
+        print("       Install the plugin with: paddlex --install paddle2onnx")
+        shutil.rmtree(onnx_dir, ignore_errors=True)
+        return False
+    print(f"[OK] {name}: exported to {onnx_dir}")
+    return True
+
+
+def main():
+    # Always export to ONNX_MODEL_DIR: it is the only place ocr.py looks
+    parser = argparse.ArgumentParser(
+        description=f"Export OCR Skill fast-mode models to ONNX for --hpi. Models are "
+                    f"written to {ONNX_MODEL_DIR}; set OCR_SKILL_CACHE to move it "
+                    f"(ocr.py reads the same variable)."
+    )
+    parser.add_argument("--opset-version", type=int, default=11,
+                        help="ONNX opset version (default: 11)")
+    args = parser.parse_args()
+
+    ONNX_MODEL_DIR.mkdir(parents=True, exist_ok=True)
+    ok = all([export_model(name, ONNX_MODEL_DIR, args.opset_version)
+              for name in (FAST_DET_MODEL, FAST_REC_MODEL)])
+    if ok:
+        print()
+        print("Done. Use with: python ocr.py image.png --fast --hpi")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
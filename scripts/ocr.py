@@ -8,13 +8,31 @@ Supports: Images (PNG, JPG, JPEG, BMP, GIF, WEBP, TIFF) and PDFs
 """
 
 import argparse
-import base64
+import functools
+import hashlib
+import io
 import json
 import os
+import secrets
 import sys
 import tempfile
+from collections import OrderedDict
+from itertools import chain
 from pathlib import Path
 
+try:
+    from pybase64 import b64encode_as_string  # SIMD base64 (libbase64)
+except ImportError:
+    import base64
+
+    def b64encode_as_string(data: bytes) -> str:
+        return base64.b64encode(data).decode("ascii")
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # Suppress warnings
 os.environ['TF_CPP_MIN_LOG_LEVEL'] = '3'
 import warnings
@@ -27,77 +45,166 @@ PDF_EXTENSION = ".pdf"
 # Default settings
 DEFAULT_MODEL = "deepseek-ocr"
 OLLAMA_BASE_URL = os.environ.get("OLLAMA_BASE_URL", "http://localhost:11434")
+# Most concurrent DeepSeek-OCR requests (--concurrency); also the HTTP pool size
+MAX_CONCURRENCY = 8
+# Keep the model resident between pages/calls. No model options are forced:
+# a num_ctx differing from the loaded instance makes Ollama reload the model
+OLLAMA_KEEP_ALIVE = "30m"
+
+# PaddleOCR fast preset: mobile models, capped detection size, no preprocessing
+FAST_OCR_VERSION = "PP-OCRv4"
+FAST_OCR_LANGS = ("ch", "en")  # PaddleOCR only has PP-OCRv4 models for these
+FAST_DET_LIMIT_SIDE_LEN = 640
+FAST_DET_MODEL = "PP-OCRv4_mobile_det"
+FAST_REC_MODEL = "PP-OCRv4_mobile_rec"
+
+# ONNX exports of the fast models (scripts/export_onnx.py), used with --hpi
+CACHE_DIR = Path(os.environ.get("OCR_SKILL_CACHE", Path.home() / ".cache" / "ocr-skill"))
+ONNX_MODEL_DIR = CACHE_DIR / "onnx"
+
+# OCR results keyed by content hash (disable with --no-cache); the least
+# recently used entries are removed once the cache exceeds the size limit
+RESULT_CACHE_DIR = CACHE_DIR / "results"
+RESULT_CACHE_MAX_MB = int(os.environ.get("OCR_SKILL_CACHE_MAX_MB", "100"))
+
+# PDF rasterization DPI (PaddleOCR's 640px detection limit doesn't need 200)
+PDF_DPI = 200
+FAST_PDF_DPI = 150
+
+# Long-lived PaddleOCR server (scripts/ocr_server.py)
+SERVER_SOCKET = os.environ.get("OCR_SERVER_SOCKET", str(CACHE_DIR / "ocr.sock"))
 
 
 # ============================================
 # DeepSeek-OCR via Ollama
 # ============================================
 
-def resize_image_if_needed(image_path: str, max_size: int = 1536) -> str:
-    """Resize image if too large, returns path to (possibly new) image."""
+def resize_image_if_needed(img, max_size: int = 1536):
+    """Resize a PIL image if too large, returns the (possibly new) image."""
+    from PIL import Image
+
+    width, height = img.size
+    if width <= max_size and height <= max_size:
+        return img
+
+    # Calculate new size maintaining aspect ratio
+    ratio = min(max_size / width, max_size / height)
+    new_size = (int(width * ratio), int(height * ratio))
+
+    print(f"Resizing image from {width}x{height} to {new_size[0]}x{new_size[1]}", file=sys.stderr)
+
+    return img.resize(new_size, Image.Resampling.LANCZOS)
+
+
+def encode_image(img, max_size: int = 1536) -> bytes:
+    """Encode a PIL image in memory: JPEG if it had to be resized, else PNG."""
+    resized = resize_image_if_needed(img, max_size)
+    buffer = io.BytesIO()
+    if resized is img:
+        img.save(buffer, "PNG")
+    else:
+        resized.convert("RGB").save(buffer, "JPEG", quality=90)
+    return buffer.getvalue()
+
+
+def load_image_bytes(image, max_size: int = 1536) -> bytes:
+    """Return image bytes for the VLM, resizing large images in memory.
+
+    image is a file path, a PIL image (e.g. a rasterized PDF page), or
+    bytes already prepared by this function (returned unchanged).
+    """
+    if isinstance(image, bytes):
+        return image
+    if not isinstance(image, str):
+        return encode_image(image, max_size)
+
+    # Read the file once; PIL only parses the header from memory to get the size
+    with open(image, "rb") as f:
+        data = f.read()
     try:
         from PIL import Image
+        with Image.open(io.BytesIO(data)) as img:
+            if img.width > max_size or img.height > max_size:
+                return encode_image(img, max_size)
     except ImportError:
-        return image_path  # Can't resize, use original
+        pass  # Can't resize, use original
+    return data
 
-    with Image.open(image_path) as img:
-        width, height = img.size
-        if width <= max_size and height <= max_size:
-            return image_path
 
-        # Calculate new size maintaining aspect ratio
-        ratio = min(max_size / width, max_size / height)
-        new_size = (int(width * ratio), int(height * ratio))
+_session = None
 
-        print(f"Resizing image from {width}x{height} to {new_size[0]}x{new_size[1]}", file=sys.stderr)
+def get_session():
+    """Return a shared keep-alive HTTP session, so PDF pages reuse one connection."""
+    global _session
+    if _session is None:
+        import requests
+        from requests.adapters import HTTPAdapter
+        _session = requests.Session()
+        _session.headers.update({"Content-Type": "application/json"})
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=MAX_CONCURRENCY)
+        _session.mount("http://", adapter)
+        _session.mount("https://", adapter)
+    return _session
+
+
+def json_body(payload: dict) -> bytes:
+    """Serialize a request body, with orjson when available."""
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload).encode("utf-8")
+
+
+def warmup_deepseek():
+    """Load the model into Ollama before OCR starts; failures surface on the real call."""
+    try:
+        # An empty prompt only loads the model; nothing is generated
+        get_session().post(
+            f"{OLLAMA_BASE_URL}/api/generate",
+            data=json_body({
+                "model": DEFAULT_MODEL,
+                "prompt": "",
+                "stream": False,
+                "keep_alive": OLLAMA_KEEP_ALIVE,
+            }),
+            timeout=300
+        )
+    except Exception:
+        pass
 
-        resized = img.resize(new_size, Image.Resampling.LANCZOS)
-        temp_file = tempfile.NamedTemporaryFile(suffix=".jpg", delete=False)
-        resized.save(temp_file.name, "JPEG", quality=90)
-        return temp_file.name
 
+def ocr_with_deepseek(image, prompt: str = "Extract all text from this image.") -> str:
+    """Perform OCR using DeepSeek-OCR via Ollama.
 
-def ocr_with_deepseek(image_path: str, prompt: str = "Extract all text from this image.") -> str:
-    """Perform OCR using DeepSeek-OCR via Ollama."""
+    image is anything load_image_bytes() accepts. Uses /api/generate, which
+    has a smaller envelope than /api/chat since no conversation is kept.
+    """
     try:
         import requests
     except ImportError:
         print("Error: requests not found. Install with: pip install requests", file=sys.stderr)
         sys.exit(1)
 
-    # Resize large images to prevent timeout
-    processed_path = resize_image_if_needed(image_path)
-
-    # Read and encode image
-    with open(processed_path, "rb") as f:
-        image_base64 = base64.b64encode(f.read()).decode("utf-8")
+    # Read and encode image (large images are resized to prevent timeout)
+    image_base64 = b64encode_as_string(load_image_bytes(image))
 
     # Call Ollama API
     try:
-        response = requests.post(
-            f"{OLLAMA_BASE_URL}/api/chat",
-            json={
+        response = get_session().post(
+            f"{OLLAMA_BASE_URL}/api/generate",
+            data=json_body({
                 "model": DEFAULT_MODEL,
-                "messages": [{
-                    "role": "user",
-                    "content": prompt,
-                    "images": [image_base64]
-                }],
-                "stream": False
-            },
+                "prompt": prompt,
+                "images": [image_base64],
+                "stream": False,
+                "keep_alive": OLLAMA_KEEP_ALIVE,
+            }),
             timeout=300
         )
         response.raise_for_status()
         result = response.json()
-
-        # Cleanup temp file if we resized
-        if processed_path != image_path:
-            try:
-                os.unlink(processed_path)
-            except Exception:
-                pass
-
-        return result.get("message", {}).get("content", "")
+        if result.get("done_reason") == "length":
+            print("Warning: DeepSeek-OCR output hit the token limit and may be truncated", file=sys.stderr)
+        return result.get("response", "")
     except requests.exceptions.ConnectionError:
         print("Error: Cannot connect to Ollama. Start with: brew services start ollama", file=sys.stderr)
         sys.exit(1)
@@ -113,56 +220,284 @@ def ocr_with_deepseek(image_path: str, prompt: str = "Extract all text from this
 # Native PaddleOCR (Fast Mode)
 # ============================================
 
-_paddle_ocr_instance = None
+# Loaded PaddleOCR instances, least recently used first
+PADDLE_CACHE_SIZE = 3
+_paddle_ocr_instances = OrderedDict()
 
-def get_paddle_ocr_instance(lang='ch'):
-    """Get or create PaddleOCR instance."""
-    global _paddle_ocr_instance
-    if _paddle_ocr_instance is None:
-        try:
-            from paddleocr import PaddleOCR
-        except ImportError:
-            print("Error: paddleocr not found. Install with: pip install paddleocr paddlepaddle", file=sys.stderr)
-            sys.exit(1)
-        print("Initializing PaddleOCR (first run may download models)...", file=sys.stderr)
-        os.environ['PADDLE_PDX_DISABLE_MODEL_SOURCE_CHECK'] = 'True'
-        _paddle_ocr_instance = PaddleOCR(lang=lang)
-    return _paddle_ocr_instance
+@functools.lru_cache(maxsize=1)
+def detect_gpu() -> bool:
+    """Return True if PaddlePaddle was built with CUDA and a GPU is visible."""
+    try:
+        import paddle
+        return paddle.device.is_compiled_with_cuda() and paddle.device.cuda.device_count() > 0
+    except Exception:
+        return False
 
 
-def ocr_with_paddle(image_path: str, lang: str = 'ch') -> str:
-    """Perform OCR using native PaddleOCR."""
-    ocr = get_paddle_ocr_instance(lang)
-    result = ocr.ocr(image_path)
+def create_paddle_ocr(lang='ch', enable_hpi=False, precision=None, cpu_threads=None,
+                      fast_preset=True, ocr_version=None, det_limit_side_len=None, device=None,
+                      rec_batch_num=None):
+    """Create a PaddleOCR instance.
+
+    With enable_hpi, PaddleOCR picks the fastest available inference backend
+    (OpenVINO, ONNXRuntime or TensorRT, fp16 where known to work). ONNX
+    exports of the fast models in ONNX_MODEL_DIR are used when present
+    (see export_onnx.py).
+
+    precision ('fp32'/'fp16') turns on Paddle Inference's TensorRT engine
+    on GPU, the only place PaddleOCR applies it; it is ignored on CPU. If
+    TensorRT rejects fp16 we retry with fp32 rather than failing.
+
+    fast_preset disables orientation/unwarping preprocessing and, for
+    PP-OCRv4 Chinese, pins the mobile det/rec models. PP-OCRv4 exists only
+    for FAST_OCR_LANGS; leave ocr_version unset for other languages.
+
+    device defaults to 'gpu' when a CUDA GPU is available, else 'cpu'.
+    rec_batch_num defaults to 32 on GPU and 8 on CPU.
+    """
+    try:
+        from paddleocr import PaddleOCR
+    except ImportError:
+        print("Error: paddleocr not found. Install with: pip install paddleocr paddlepaddle", file=sys.stderr)
+        sys.exit(1)
+    print(f"Initializing PaddleOCR for '{lang}' (first run may download models)...", file=sys.stderr)
+    os.environ['PADDLE_PDX_DISABLE_MODEL_SOURCE_CHECK'] = 'True'
+    device = device or ('gpu' if detect_gpu() else 'cpu')
+    print(f"PaddleOCR device: {device}", file=sys.stderr)
+    kwargs = {
+        'lang': lang,
+        'device': device,
+        'cpu_threads': cpu_threads or os.cpu_count(),
+        'text_recognition_batch_size': rec_batch_num or (32 if device == 'gpu' else 8),
+    }
+    if enable_hpi:
+        kwargs['enable_hpi'] = True
+    if precision and device.startswith('gpu'):
+        kwargs.update(use_tensorrt=True, precision=precision)
+    elif precision:
+        print("Warning: --precision only applies on GPU (TensorRT), ignoring", file=sys.stderr)
+    if ocr_version:
+        kwargs['ocr_version'] = ocr_version
+    if det_limit_side_len:
+        # Cap the longest side; PaddleOCR's default 'min' limit would upscale
+        kwargs.update(text_det_limit_side_len=det_limit_side_len, text_det_limit_type='max')
+    if fast_preset:
+        kwargs.update(
+            use_textline_orientation=False,
+            use_doc_orientation_classify=False,
+            use_doc_unwarping=False,
+        )
+        # English gets en_PP-OCRv4_mobile_rec from lang + ocr_version
+        if ocr_version == FAST_OCR_VERSION and lang == 'ch':
+            kwargs.update(
+                text_detection_model_name=FAST_DET_MODEL,
+                text_recognition_model_name=FAST_REC_MODEL,
+            )
+            if enable_hpi:
+                kwargs.update(onnx_model_options(device))
+    try:
+        return PaddleOCR(**kwargs)
+    except Exception as e:
+        # Only retry an actual precision rejection, not e.g. missing HPI deps
+        if kwargs.get('precision') != 'fp16' or not any(
+                word in str(e).lower() for word in ('fp16', 'half', 'precision')):
+            raise
+        print(f"Warning: fp16 not supported ({e}), falling back to fp32", file=sys.stderr)
+        kwargs['precision'] = 'fp32'
+        return PaddleOCR(**kwargs)
+
+
+def onnx_model_options(device: str) -> dict:
+    """PaddleOCR kwargs that point HPI at exported ONNX fast models, if both exist."""
+    det_dir = ONNX_MODEL_DIR / FAST_DET_MODEL
+    rec_dir = ONNX_MODEL_DIR / FAST_REC_MODEL
+    if not ((det_dir / "inference.onnx").exists() and (rec_dir / "inference.onnx").exists()):
+        return {}
+    print(f"Using ONNX models from {ONNX_MODEL_DIR}", file=sys.stderr)
+    options = {
+        'text_detection_model_dir': str(det_dir),
+        'text_recognition_model_dir': str(rec_dir),
+    }
+    if device == 'cpu':
+        # On GPU, leave HPI free to build TensorRT engines from the ONNX models.
+        # PaddleOCR has no hpi_config argument: it is set per submodule in the
+        # PaddleX pipeline config, which replaces (not merges with) the default
+        from paddlex.inference import load_pipeline_config
+        config = load_pipeline_config("OCR")
+        for module in ("TextDetection", "TextRecognition"):
+            config["SubModules"][module]["hpi_config"] = {'auto_config': False, 'backend': 'onnxruntime'}
+        options['paddlex_config'] = config
+    return options
+
+
+def warmup_paddle_ocr(ocr):
+    """Run a dummy inference so graph setup and allocations don't hit the first real image.
+
+    Set OCR_SKIP_WARMUP=1 to skip (e.g. in CI).
+    """
+    if os.environ.get('OCR_SKIP_WARMUP'):
+        return
+    import numpy as np
+    try:
+        ocr.ocr(np.zeros((64, 64, 3), dtype=np.uint8))
+    except Exception as e:
+        print(f"Warning: PaddleOCR warmup failed: {e}", file=sys.stderr)
+
+
+def get_paddle_ocr_instance(lang='ch', **options):
+    """Get or create a PaddleOCR instance for this language and options.
+
+    Up to PADDLE_CACHE_SIZE instances are kept, evicting the least recently
+    used one to bound (GPU) memory.
+    """
+    key = (lang, tuple(sorted(options.items())))
+    ocr = _paddle_ocr_instances.get(key)
+    if ocr is not None:
+        _paddle_ocr_instances.move_to_end(key)
+        return ocr
+    ocr = create_paddle_ocr(lang, **options)
+    warmup_paddle_ocr(ocr)
+    _paddle_ocr_instances[key] = ocr
+    while len(_paddle_ocr_instances) > PADDLE_CACHE_SIZE:
+        _paddle_ocr_instances.popitem(last=False)
+    return ocr
+
+
+def server_authkey(socket_path: str = SERVER_SOCKET, create: bool = False):
+    """Shared secret for the OCR server, kept next to the socket (mode 600).
+
+    The server creates a fresh key at startup (create=True); clients read
+    it and get None if it is missing or unreadable. multiprocessing
+    connections unpickle what they receive, so only key holders may talk.
+    """
+    key_path = socket_path + ".key"
+    if create:
+        if os.path.exists(key_path):
+            os.unlink(key_path)  # O_CREAT's mode only applies to new files
+        key = secrets.token_bytes(32)
+        fd = os.open(key_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, "wb") as f:
+            f.write(key)
+        return key
+    try:
+        with open(key_path, "rb") as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def ocr_with_server(image, lang: str = 'ch', paddle_options: dict = None):
+    """Send an OCR request to a running ocr_server.py.
+
+    image is a path, an array, or a list of arrays (returns a list of texts).
+    Returns None if no server is listening, so callers can fall back to
+    in-process OCR.
+    """
+    authkey = server_authkey()
+    if not os.path.exists(SERVER_SOCKET) or authkey is None:
+        return None
+    from multiprocessing import AuthenticationError
+    from multiprocessing.connection import Client
+    try:
+        with Client(SERVER_SOCKET, family='AF_UNIX', authkey=authkey) as conn:
+            conn.send({
+                "image": os.path.abspath(image) if isinstance(image, str) else image,
+                "lang": lang,
+                "options": paddle_options or {},
+            })
+            reply = conn.recv()
+    except (OSError, EOFError, AuthenticationError) as e:
+        print(f"Warning: OCR server unavailable ({e}), running in-process", file=sys.stderr)
+        return None
+    if "error" in reply:
+        print(f"Error from OCR server: {reply['error']}", file=sys.stderr)
+        sys.exit(1)
+    return reply["text"]
+
+
+def page_result_lines(page_result) -> list:
+    """Extract text lines from one PaddleOCR page result."""
+    if not page_result:
+        return []
+    # New format: page_result is a dict with 'rec_texts' key (PaddleOCR 3.x)
+    if isinstance(page_result, dict):
+        return page_result['rec_texts']
+    # Old format: page_result is a list of [box, (text, confidence)].
+    # Every line of a page has the same shape, so check it once.
+    entries = [line for line in page_result if line and len(line) >= 2]
+    if entries and isinstance(entries[0][1], tuple):
+        return [line[1][0] for line in entries]
+    return [line[1] for line in entries]
+
+
+def flatten_rec_texts(page_results) -> str:
+    """Join the text lines of several page results in one pass."""
+    return '\n'.join(chain.from_iterable(map(page_result_lines, page_results)))
+
+
+def ocr_with_paddle(image, lang: str = 'ch', paddle_options: dict = None,
+                    use_server: bool = False) -> str:
+    """Perform OCR using native PaddleOCR. image is a path or BGR numpy array."""
+    if use_server:
+        text = ocr_with_server(image, lang, paddle_options)
+        if text is not None:
+            return text
+    ocr = get_paddle_ocr_instance(lang, **(paddle_options or {}))
+    result = ocr.ocr(image)
 
     if result is None or len(result) == 0:
         return ""
+    return flatten_rec_texts(result)
+
 
-    # Extract text from results (PaddleOCR 3.x format)
-    lines = []
-    for page_result in result:
-        if page_result is None:
-            continue
-        # New format: page_result is a dict with 'rec_texts' key
-        if isinstance(page_result, dict):
-            rec_texts = page_result.get('rec_texts', [])
-            lines.extend(rec_texts)
-        # Old format: page_result is a list of [box, (text, confidence)]
-        elif isinstance(page_result, list):
-            for line in page_result:
-                if line and len(line) >= 2:
-                    text = line[1][0] if isinstance(line[1], tuple) else line[1]
-                    lines.append(text)
-
-    return '\n'.join(lines)
+def ocr_pages_with_paddle(images: list, lang: str = 'ch', paddle_options: dict = None,
+                          use_server: bool = False) -> list:
+    """OCR several images in a single PaddleOCR call, returning one text per image."""
+    if use_server:
+        texts = ocr_with_server(images, lang, paddle_options)
+        if texts is not None:
+            return texts
+    ocr = get_paddle_ocr_instance(lang, **(paddle_options or {}))
+    results = ocr.ocr(images) or []
+    return ['\n'.join(page_result_lines(page_result)) for page_result in results]
+
+
+_worker_config = None
+
+def _init_paddle_worker(lang: str, paddle_options: dict):
+    """ProcessPoolExecutor initializer: load PaddleOCR once per worker."""
+    global _worker_config
+    _worker_config = (lang, paddle_options)
+    get_paddle_ocr_instance(lang, **paddle_options)
+
+
+def _ocr_page(image) -> str:
+    lang, paddle_options = _worker_config
+    return ocr_with_paddle(image, lang, paddle_options)
+
+
+def ocr_pages_in_processes(images: list, lang: str = 'ch', paddle_options: dict = None,
+                           workers: int = 2) -> list:
+    """OCR images across worker processes, each with its own PaddleOCR instance."""
+    from concurrent.futures import ProcessPoolExecutor
+
+    workers = min(workers, len(images))
+    paddle_options = dict(paddle_options or {})
+    if not paddle_options.get('cpu_threads'):
+        # Split the cores between workers instead of oversubscribing them
+        paddle_options['cpu_threads'] = max(1, (os.cpu_count() or 1) // workers)
+    print(f"OCR {len(images)} page(s) with {workers} worker processes...", file=sys.stderr)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_paddle_worker,
+                             initargs=(lang, paddle_options)) as executor:
+        return list(executor.map(_ocr_page, images))
 
 
 # ============================================
 # PDF Processing
 # ============================================
 
-def pdf_to_images(pdf_path: str) -> list:
-    """Convert PDF pages to temporary image files."""
+def pdf_to_images(pdf_path: str, dpi: int = PDF_DPI) -> list:
+    """Convert PDF pages to in-memory PIL images."""
     try:
         from pdf2image import convert_from_path
     except ImportError:
@@ -171,38 +506,126 @@ def pdf_to_images(pdf_path: str) -> list:
         sys.exit(1)
 
     try:
-        images = convert_from_path(pdf_path, dpi=200)
+        # PPM is uncompressed, so pages skip a PNG encode/decode round-trip;
+        # poppler rasterizes page ranges in parallel across thread_count processes
+        images = convert_from_path(pdf_path, dpi=dpi, fmt="ppm",
+                                   thread_count=min(os.cpu_count() or 1, 8))
     except Exception as e:
         print(f"Error converting PDF: {e}", file=sys.stderr)
         print("Ensure poppler is installed: brew install poppler", file=sys.stderr)
         sys.exit(1)
 
-    temp_paths = []
-    for i, image in enumerate(images):
-        temp_file = tempfile.NamedTemporaryFile(
-            suffix=".png", delete=False, prefix=f"page_{i+1}_"
-        )
-        image.save(temp_file.name, "PNG")
-        temp_paths.append(temp_file.name)
-        print(f"Converted page {i+1}/{len(images)}", file=sys.stderr)
+    print(f"Converted {len(images)} page(s)", file=sys.stderr)
+    return images
+
 
-    return temp_paths
+def pdf_to_arrays(pdf_path: str, dpi: int = FAST_PDF_DPI) -> list:
+    """Convert PDF pages to BGR numpy arrays that PaddleOCR accepts directly."""
+    import numpy as np
+
+    # PaddleOCR treats arrays as OpenCV-style BGR
+    return [np.ascontiguousarray(np.asarray(img.convert("RGB"))[:, :, ::-1])
+            for img in pdf_to_images(pdf_path, dpi)]
+
+
+# ============================================
+# Result Cache
+# ============================================
+
+def cache_key(data, mode: str, *params) -> str:
+    """Content hash of the input bytes plus everything that affects the OCR output."""
+    h = hashlib.blake2b(data, digest_size=16)
+    for param in (mode,) + params:
+        h.update(b'\0')
+        h.update(str(param).encode('utf-8'))
+    return h.hexdigest()
+
+
+def cache_get(key: str):
+    """Return the cached text for key, or None."""
+    path = RESULT_CACHE_DIR / f"{key}.txt"
+    try:
+        text = path.read_text(encoding='utf-8')
+    except (FileNotFoundError, UnicodeDecodeError):
+        return None
+    try:
+        os.utime(path)  # Mark as recently used for prune_cache()
+    except OSError:
+        pass
+    return text
+
+
+def cache_put(key: str, text: str):
+    """Store text for key; written atomically so an interrupted run leaves no partial entry.
+
+    Empty results are not stored, so a transient failure is retried next run.
+    """
+    if not text or not text.strip():
+        return
+    try:
+        RESULT_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        # A unique temp file per call: threads may store identical pages at once
+        fd, tmp_path = tempfile.mkstemp(dir=RESULT_CACHE_DIR, prefix=f"{key}.", suffix=".tmp")
+        with os.fdopen(fd, "w", encoding='utf-8') as f:
+            f.write(text)
+        os.replace(tmp_path, RESULT_CACHE_DIR / f"{key}.txt")
+    except OSError as e:
+        print(f"Warning: could not write OCR cache: {e}", file=sys.stderr)
+
+
+def prune_cache(max_mb: int = RESULT_CACHE_MAX_MB):
+    """Delete the least recently used cache entries until the cache fits in max_mb."""
+    try:
+        with os.scandir(RESULT_CACHE_DIR) as it:
+            entries = [(e.stat().st_mtime, e.stat().st_size, e.path)
+                       for e in it if e.name.endswith(".txt")]
+    except OSError:
+        return
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_mb * 1024 * 1024:
+            break
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+        total -= size
+
+
+def cache_params(fast_mode: bool, prompt: str, lang: str, paddle_options: dict) -> tuple:
+    """Mode and parameters that make up a cache key."""
+    if fast_mode:
+        return ("paddle", lang, sorted((paddle_options or {}).items()))
+    return ("deepseek", DEFAULT_MODEL, prompt)
 
 
 # ============================================
 # Main Processing Functions
 # ============================================
 
-def process_image(image_path: str, prompt: str = None, fast_mode: bool = False, lang: str = 'ch') -> dict:
+def process_image(image_path: str, prompt: str = None, fast_mode: bool = False, lang: str = 'ch',
+                  paddle_options: dict = None, use_server: bool = False, use_cache: bool = True) -> dict:
     """Process a single image and return OCR result."""
     print(f"Processing: {image_path}", file=sys.stderr)
-
-    if fast_mode:
-        print("Mode: PaddleOCR (fast)", file=sys.stderr)
-        text = ocr_with_paddle(image_path, lang)
-    else:
-        print("Mode: DeepSeek-OCR (smart)", file=sys.stderr)
-        text = ocr_with_deepseek(image_path, prompt or "Extract all text from this image.")
+    prompt = prompt or "Extract all text from this image."
+
+    text = key = None
+    if use_cache:
+        with open(image_path, "rb") as f:
+            key = cache_key(f.read(), *cache_params(fast_mode, prompt, lang, paddle_options))
+        text = cache_get(key)
+        if text is not None:
+            print("Using cached result", file=sys.stderr)
+
+    if text is None:
+        if fast_mode:
+            print("Mode: PaddleOCR (fast)", file=sys.stderr)
+            text = ocr_with_paddle(image_path, lang, paddle_options, use_server)
+        else:
+            print("Mode: DeepSeek-OCR (smart)", file=sys.stderr)
+            text = ocr_with_deepseek(image_path, prompt)
+        if key:
+            cache_put(key, text)
 
     return {
         "source": str(image_path),
@@ -212,30 +635,75 @@ def process_image(image_path: str, prompt: str = None, fast_mode: bool = False,
     }
 
 
-def process_pdf(pdf_path: str, prompt: str = None, fast_mode: bool = False, lang: str = 'ch') -> dict:
-    """Process a PDF file by converting to images and OCR each page."""
-    print(f"Processing PDF: {pdf_path}", file=sys.stderr)
-    temp_images = pdf_to_images(pdf_path)
+def process_pdf(pdf_path: str, prompt: str = None, fast_mode: bool = False, lang: str = 'ch',
+                paddle_options: dict = None, use_server: bool = False, workers: int = 1,
+                concurrency: int = 1, dpi: int = None, use_cache: bool = True) -> dict:
+    """Process a PDF file by converting to images and OCR each page.
 
-    pages = []
-    try:
-        for i, image_path in enumerate(temp_images):
-            print(f"OCR page {i+1}/{len(temp_images)}...", file=sys.stderr)
-            if fast_mode:
-                text = ocr_with_paddle(image_path, lang)
-            else:
-                text = ocr_with_deepseek(image_path, prompt or "Extract all text from this image.")
-            pages.append({
-                "page": i + 1,
-                "text": text
-            })
-    finally:
-        # Cleanup temporary files
-        for temp_path in temp_images:
-            try:
-                os.unlink(temp_path)
-            except Exception:
-                pass
+    In fast mode with workers > 1, pages are spread over CPU worker
+    processes (ignored on GPU and with a server, which batch instead).
+    In DeepSeek mode, up to `concurrency` pages (at most MAX_CONCURRENCY)
+    are sent to Ollama at once.
+    dpi defaults to FAST_PDF_DPI in fast mode and PDF_DPI otherwise.
+    With use_cache, each page is cached separately, so reruns only OCR
+    pages that were not finished before.
+    """
+    print(f"Processing PDF: {pdf_path}", file=sys.stderr)
+    prompt = prompt or "Extract all text from this image."
+    if fast_mode:
+        images = pdf_to_arrays(pdf_path, dpi or FAST_PDF_DPI)
+    else:
+        # Encode each page once up front; the compressed bytes are far smaller
+        # than the decoded bitmaps, which can be freed before the API calls
+        images = [load_image_bytes(img) for img in pdf_to_images(pdf_path, dpi or PDF_DPI)]
+
+    texts = [None] * len(images)
+    keys = [None] * len(images)
+    if use_cache:
+        params = cache_params(fast_mode, prompt, lang, paddle_options)
+        keys = [cache_key(image, *params) for image in images]
+        texts = [cache_get(key) for key in keys]
+    todo = [i for i, text in enumerate(texts) if text is None]
+    if len(todo) < len(images):
+        print(f"Using cached results for {len(images) - len(todo)} page(s)", file=sys.stderr)
+
+    def store(i, text):
+        texts[i] = text
+        if keys[i]:
+            cache_put(keys[i], text)
+
+    def deepseek_page(i):
+        store(i, ocr_with_deepseek(images[i], prompt))
+
+    device = (paddle_options or {}).get('device')
+    use_workers = (fast_mode and workers > 1 and len(todo) > 1 and not use_server
+                   and (device or ('gpu' if detect_gpu() else 'cpu')) == 'cpu')
+
+    if todo and use_workers:
+        todo_images = [images[i] for i in todo]
+        for i, text in zip(todo, ocr_pages_in_processes(todo_images, lang, paddle_options, workers)):
+            store(i, text)
+    elif todo and fast_mode:
+        print(f"OCR {len(todo)} page(s) in one batch...", file=sys.stderr)
+        todo_images = [images[i] for i in todo]
+        for i, text in zip(todo, ocr_pages_with_paddle(todo_images, lang, paddle_options, use_server)):
+            store(i, text)
+    elif todo and concurrency > 1 and len(todo) > 1:
+        from concurrent.futures import ThreadPoolExecutor
+
+        # More threads than pooled connections would open a new one per request
+        concurrency = min(concurrency, MAX_CONCURRENCY, len(todo))
+        warmup_deepseek()
+        print(f"OCR {len(todo)} page(s), {concurrency} at a time...", file=sys.stderr)
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            list(executor.map(deepseek_page, todo))
+    elif todo:
+        warmup_deepseek()
+        for i in todo:
+            print(f"OCR page {i+1}/{len(images)}...", file=sys.stderr)
+            deepseek_page(i)
+
+    pages = [{"page": i + 1, "text": text} for i, text in enumerate(texts)]
 
     return {
         "source": str(pdf_path),
@@ -246,10 +714,17 @@ def process_pdf(pdf_path: str, prompt: str = None, fast_mode: bool = False, lang
     }
 
 
+def dump_json(result: dict) -> bytes:
+    """Serialize the OCR result as indented UTF-8 JSON, with orjson when available."""
+    if orjson is not None:
+        return orjson.dumps(result, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(result, indent=2, ensure_ascii=False).encode("utf-8")
+
+
 def format_output(result: dict, as_json: bool = False) -> str:
     """Format the OCR result for output."""
     if as_json:
-        return json.dumps(result, indent=2, ensure_ascii=False)
+        return dump_json(result).decode("utf-8")
 
     if result.get("type") == "pdf":
         parts = []
@@ -260,6 +735,51 @@ def format_output(result: dict, as_json: bool = False) -> str:
         return result.get("text", "")
 
 
+def add_paddle_arguments(parser: argparse.ArgumentParser):
+    """Add PaddleOCR (fast mode) options to a parser; shared with ocr_server.py."""
+    parser.add_argument("--lang", "-l", default="ch",
+                        help="Language for PaddleOCR (default: ch for Chinese+English)")
+    parser.add_argument("--hpi", action="store_true",
+                        help="Enable PaddleOCR high-performance inference (OpenVINO/ONNXRuntime/TensorRT)")
+    parser.add_argument("--precision", choices=["fp32", "fp16"],
+                        help="On GPU, run Paddle Inference's TensorRT engine at this precision "
+                             "(fp16 falls back to fp32; default: off, --hpi picks fp16 itself where supported)")
+    parser.add_argument("--cpu-threads", type=int,
+                        help="CPU threads for PaddleOCR (default: all cores)")
+    parser.add_argument("--ocr-version",
+                        help=f"PaddleOCR model version (default: {FAST_OCR_VERSION} for "
+                             f"{'/'.join(FAST_OCR_LANGS)}, otherwise or with --accurate PaddleOCR's default)")
+    parser.add_argument("--det-limit-side-len", type=int,
+                        help=f"Max image side for text detection (default: {FAST_DET_LIMIT_SIDE_LEN}, "
+                             "or PaddleOCR's default with --accurate)")
+    parser.add_argument("--accurate", action="store_true",
+                        help="Use PaddleOCR's default (PP-OCRv5 server) models and preprocessing instead of the fast preset")
+    parser.add_argument("--rec-batch-num", type=int,
+                        help="Text recognition batch size (default: 32 on GPU, 8 on CPU)")
+    device_group = parser.add_mutually_exclusive_group()
+    device_group.add_argument("--gpu", action="store_const", const="gpu", dest="device",
+                              help="Force PaddleOCR to run on GPU (default: auto-detect)")
+    device_group.add_argument("--cpu", action="store_const", const="cpu", dest="device",
+                              help="Force PaddleOCR to run on CPU")
+
+
+def paddle_options_from_args(args: argparse.Namespace) -> dict:
+    """Build get_paddle_ocr_instance() keyword arguments from parsed options."""
+    return {
+        "enable_hpi": args.hpi,
+        "precision": args.precision,
+        "cpu_threads": args.cpu_threads,
+        "fast_preset": not args.accurate,
+        # Other languages keep PaddleOCR's version (v5/v3); the fast preset
+        # still caps the detection size and skips preprocessing for them
+        "ocr_version": args.ocr_version or (
+            FAST_OCR_VERSION if not args.accurate and args.lang in FAST_OCR_LANGS else None),
+        "det_limit_side_len": args.det_limit_side_len or (None if args.accurate else FAST_DET_LIMIT_SIDE_LEN),
+        "device": args.device,
+        "rec_batch_num": args.rec_batch_num,
+    }
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="OCR Skill - DeepSeek-OCR (default) or PaddleOCR (fast mode)",
@@ -268,14 +788,20 @@ def main():
 Examples:
   python ocr.py image.png                     # DeepSeek-OCR (smart mode)
   python ocr.py image.png --fast              # PaddleOCR (fast mode)
+  python ocr.py image.png --fast --hpi        # PaddleOCR with high-performance inference
+  python ocr.py scan.png --fast --accurate    # PaddleOCR with PP-OCRv5 server models
+  python ocr.py image.png --fast --server     # Use a running ocr_server.py (models stay loaded)
   python ocr.py image.png --prompt "提取表格为markdown"
   python ocr.py document.pdf                  # OCR all pages of a PDF
+  python ocr.py document.pdf --fast --workers 4  # Fast mode, 4 CPU worker processes
+  python ocr.py scan.pdf --dpi 300            # Higher DPI for low-quality scans
   python ocr.py image.png --json              # Output as JSON
   python ocr.py doc.pdf -o result.txt         # Save to file
 
 Modes:
   Default (DeepSeek-OCR): VLM-based, supports custom prompts, smarter
   --fast (PaddleOCR): Traditional OCR, faster, pure text extraction
+                      (PP-OCRv4 mobile models for ch/en at 640px; --accurate for PP-OCRv5)
 
 Supported formats:
   Images: PNG, JPG, JPEG, BMP, GIF, WEBP, TIFF
@@ -287,37 +813,57 @@ Supported formats:
                         help="Use PaddleOCR for faster pure text extraction")
     parser.add_argument("--prompt", "-p",
                         help="Custom prompt for DeepSeek-OCR (ignored in fast mode)")
-    parser.add_argument("--lang", "-l", default="ch",
-                        help="Language for PaddleOCR (default: ch for Chinese+English)")
+    add_paddle_arguments(parser)
+    parser.add_argument("--server", action="store_true",
+                        help="In fast mode, use a running ocr_server.py if available")
+    parser.add_argument("--dpi", type=int,
+                        help=f"PDF rasterization DPI (default: {FAST_PDF_DPI} in fast mode, {PDF_DPI} otherwise)")
+    parser.add_argument("--concurrency", type=int, default=2,
+                        help=f"Concurrent DeepSeek-OCR requests for PDF pages "
+                             f"(default: 2, 1 = sequential, max: {MAX_CONCURRENCY})")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="In fast mode on CPU, OCR PDF pages in N worker processes (default: 1)")
+    parser.add_argument("--no-cache", action="store_true",
+                        help=f"Don't read or write cached results in {RESULT_CACHE_DIR} "
+                             f"(capped at {RESULT_CACHE_MAX_MB} MB, set OCR_SKILL_CACHE_MAX_MB)")
     parser.add_argument("--json", "-j", action="store_true", help="Output as JSON")
     parser.add_argument("--output", "-o", help="Output file path (default: stdout)")
 
     args = parser.parse_args()
 
+    if not 1 <= args.concurrency <= MAX_CONCURRENCY:
+        print(f"Error: --concurrency must be between 1 and {MAX_CONCURRENCY}", file=sys.stderr)
+        sys.exit(1)
+
     input_path = Path(args.input_file)
     if not input_path.exists():
         print(f"Error: File not found: {args.input_file}", file=sys.stderr)
         sys.exit(1)
 
     suffix = input_path.suffix.lower()
+    paddle_options = paddle_options_from_args(args)
 
     if suffix == PDF_EXTENSION:
-        result = process_pdf(str(input_path), args.prompt, args.fast, args.lang)
+        result = process_pdf(str(input_path), args.prompt, args.fast, args.lang, paddle_options, args.server,
+                             args.workers, args.concurrency, args.dpi, not args.no_cache)
     elif suffix in IMAGE_EXTENSIONS:
-        result = process_image(str(input_path), args.prompt, args.fast, args.lang)
+        result = process_image(str(input_path), args.prompt, args.fast, args.lang, paddle_options, args.server,
+                               not args.no_cache)
     else:
         print(f"Error: Unsupported file type: {suffix}", file=sys.stderr)
         print(f"Supported: PDF, {', '.join(sorted(IMAGE_EXTENSIONS))}", file=sys.stderr)
         sys.exit(1)
-
-    output_text = format_output(result, args.json)
+    if not args.no_cache:
+        prune_cache()
 
     if args.output:
-        with open(args.output, "w", encoding="utf-8") as f:
-            f.write(output_text)
+        # Write JSON bytes directly instead of decoding and re-encoding them
+        data = dump_json(result) if args.json else format_output(result).encode("utf-8")
+        with open(args.output, "wb") as f:
+            f.write(data)
         print(f"Output saved to: {args.output}", file=sys.stderr)
     else:
-        print(output_text)
+        print(format_output(result, args.json))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+OCR Skill - PaddleOCR Server
+Keeps a PaddleOCR instance loaded so `ocr.py --fast --server` skips the
+multi-second paddle import and model load on every invocation.
+
+Usage:
+  python ocr_server.py                # Listen on ~/.cache/ocr-skill/ocr.sock
+  python ocr_server.py --lang en      # Preload English models
+  python ocr.py image.png --fast --server
+"""
+
+import argparse
+import os
+import sys
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Listener
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from ocr import (  # noqa: E402
+    SERVER_SOCKET,
+    add_paddle_arguments,
+    get_paddle_ocr_instance,
+    ocr_pages_with_paddle,
+    ocr_with_paddle,
+    paddle_options_from_args,
+    server_authkey,
+)
+
+
+def handle(request: dict) -> dict:
+    """Run one OCR request and build the reply sent back to the client."""
+    if not isinstance(request, dict) or "image" not in request:
+        return {"error": "invalid request: expected a dict with an 'image' key"}
+    try:
+        image, lang, options = request["image"], request.get("lang", "ch"), request.get("options")
+        if isinstance(image, list):
+            return {"text": ocr_pages_with_paddle(image, lang, options)}
+        return {"text": ocr_with_paddle(image, lang, options)}
+    except Exception as e:
+        return {"error": str(e)}
+    except SystemExit:
+        # create_paddle_ocr exits on missing paddleocr or a failed init;
+        # that must fail this request, not stop the server
+        return {"error": "PaddleOCR failed to initialize (see server log)"}
+
+
+def serve(socket_path: str):
+    """Accept OCR requests on a Unix socket, one at a time."""
+    Path(socket_path).parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)  # Stale socket from a previous run
+
+    # Clients must prove they can read the key file, and the socket is owner-only
+    # from the moment it is bound (chmod after bind would leave a window)
+    authkey = server_authkey(socket_path, create=True)
+    old_umask = os.umask(0o177)
+    try:
+        listener = Listener(socket_path, family='AF_UNIX', authkey=authkey)
+    finally:
+        os.umask(old_umask)
+
+    with listener:
+        print(f"OCR server listening on {socket_path}", file=sys.stderr)
+        try:
+            while True:
+                try:
+                    conn = listener.accept()
+                except (OSError, EOFError, AuthenticationError) as e:
+                    print(f"Warning: accept failed: {e}", file=sys.stderr)
+                    continue
+                with conn:
+                    try:
+                        request = conn.recv()
+                    except (EOFError, OSError):
+                        continue  # Client went away
+                    except Exception as e:  # e.g. pickle.UnpicklingError
+                        print(f"Warning: bad request: {e}", file=sys.stderr)
+                        continue
+                    try:
+                        conn.send(handle(request))
+                    except (EOFError, OSError):
+                        pass  # Client went away
+        except KeyboardInterrupt:
+            print("\nShutting down OCR server", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="OCR Skill - keep PaddleOCR loaded for fast repeated OCR"
+    )
+    parser.add_argument("--socket", default=SERVER_SOCKET,
+                        help=f"Unix socket path (default: {SERVER_SOCKET})")
+    add_paddle_arguments(parser)
+    args = parser.parse_args()
+
+    # Loads and warms up the models so the first request is hot
+    get_paddle_ocr_instance(args.lang, **paddle_options_from_args(args))
+    serve(args.socket)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,114 +1,301 @@
 #!/usr/bin/env python3
 """Check OCR Skill environment setup (DeepSeek-OCR + PaddleOCR)."""
 
+import argparse
+import base64
+import functools
+import http.client
+import io
+import json
+import os
+import re
+import shlex
+import shutil
+import signal
 import subprocess
 import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from importlib import metadata
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
-def check_ollama():
-    """Check if Ollama is installed."""
+
+def json_body(payload):
+    """Serialize a request body, with orjson when available."""
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload).encode("utf-8")
+
+
+def spawn(cmd):
+    """Start an external command in the background; None if it isn't installed."""
     try:
-        result = subprocess.run(
-            ["ollama", "--version"],
-            capture_output=True,
-            text=True
+        return subprocess.Popen(
+            cmd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            encoding="utf-8",  # No locale lookup per spawn
+            errors="replace",
+            close_fds=False,  # fds are non-inheritable anyway; skips the close loop
+            start_new_session=True
         )
-        if result.returncode == 0:
-            version = result.stdout.strip() or result.stderr.strip()
-            print(f"[OK] Ollama installed: {version}")
-            return True
     except FileNotFoundError:
-        pass
-    print("[FAIL] Ollama not found. Install with: brew install ollama")
+        return None
+
+
+OLLAMA_SPLIT = "---SPLIT---"
+
+
+def spawn_external_checks(cached=()):
+    """Launch all external binaries up front so they run concurrently.
+
+    Binaries are looked up on PATH in-process, so a missing one costs no
+    fork, and are run by absolute path. Commands for checks whose result
+    is in `cached` are not started.
+    """
+    ollama, pdftoppm = shutil.which("ollama"), shutil.which("pdftoppm")
+    procs = {"ollama": None, "poppler": None}
+    if ollama:
+        # One shell runs both ollama commands: a single spawn and Go runtime start
+        ollama = shlex.quote(ollama)
+        # Each command's exit status follows its output: "---SPLIT--- <status>"
+        procs["ollama"] = spawn(["sh", "-c", f"{ollama} --version 2>&1; echo {OLLAMA_SPLIT} $?; "
+                                             f"{ollama} list 2>&1; echo {OLLAMA_SPLIT} $?"])
+    if pdftoppm and "Poppler" not in cached:
+        procs["poppler"] = spawn([pdftoppm, "-v"])
+    return procs
+
+
+def collect(proc, timeout=5, partial=False):
+    """Wait for a spawned command; returns (stdout, stderr), or None if it didn't run.
+
+    On timeout the whole process group is killed (a shell's children would
+    otherwise keep the pipes open); with `partial`, the output produced so
+    far is returned instead of None.
+    """
+    if proc is None:
+        return None
+    try:
+        return proc.communicate(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        try:
+            os.killpg(proc.pid, signal.SIGKILL)  # Spawned with start_new_session
+        except OSError:
+            pass
+        output = proc.communicate()
+        return output if partial else None
+
+
+_ollama_lock = threading.Lock()
+
+@functools.lru_cache(maxsize=1)
+def _ollama_sections(proc):
+    # A hung `ollama list` must not lose the `--version` section
+    output = collect(proc, timeout=10, partial=True)
+    # [output, status, output, status, trailing ""]
+    parts = re.split(rf"^{OLLAMA_SPLIT} (\d+)\n", output[0] if output else "", flags=re.M)
+    sections = [(parts[i], int(parts[i + 1])) for i in range(0, len(parts) - 1, 2)]
+    return (sections + [("", None)] * 2)[:2]  # Missing sections: the command didn't finish
+
+
+def ollama_output(proc):
+    """[(output, exit status)] of `ollama --version` and `ollama list`, collected once."""
+    with _ollama_lock:  # Both ollama checks read the same process
+        return _ollama_sections(proc)
+
+
+def check_ollama(version_output, returncode, out=None):
+    """Check if Ollama is installed."""
+    if returncode == 0:
+        # "ollama version is X", or "Warning: client version is X" with the server down
+        match = re.search(r"version is (\S+)", version_output)
+        version = f"ollama version is {match.group(1)}" if match else version_output.strip()
+        print(f"[OK] Ollama installed: {version}", file=out)
+        return True
+    print("[FAIL] Ollama not found. Install with: brew install ollama", file=out)
     return False
 
 
-def check_ollama_running():
+def check_ollama_running(out=None):
     """Check if Ollama server is running."""
+    # Plain http.client: importing requests costs more than this one GET
+    conn = http.client.HTTPConnection("localhost", 11434, timeout=5)
     try:
-        import requests
-        response = requests.get("http://localhost:11434/api/tags", timeout=5)
-        if response.status_code == 200:
-            print("[OK] Ollama server is running")
+        conn.request("GET", "/api/tags")
+        if conn.getresponse().status == 200:
+            print("[OK] Ollama server is running", file=out)
             return True
-    except Exception:
+    except (OSError, http.client.HTTPException):
         pass
-    print("[FAIL] Ollama server not running. Start with: brew services start ollama")
+    finally:
+        conn.close()
+    print("[FAIL] Ollama server not running. Start with: brew services start ollama", file=out)
     return False
 
 
-def check_deepseek_model():
+def check_deepseek_model(list_output, returncode, out=None):
     """Check if DeepSeek-OCR model is installed."""
-    try:
-        result = subprocess.run(
-            ["ollama", "list"],
-            capture_output=True,
-            text=True
-        )
-        if "deepseek-ocr" in result.stdout.lower():
-            for line in result.stdout.split('\n'):
-                if 'deepseek-ocr' in line.lower():
-                    print(f"[OK] DeepSeek-OCR model installed: {line.strip()}")
-                    return True
-    except Exception:
-        pass
-    print("[WARN] DeepSeek-OCR model not found. Pull with:")
-    print("       ollama pull deepseek-ocr")
+    for line in list_output.splitlines() if returncode == 0 else ():
+        if 'deepseek-ocr' in line.lower():
+            print(f"[OK] DeepSeek-OCR model installed: {line.strip()}", file=out)
+            return True
+    print("[WARN] DeepSeek-OCR model not found. Pull with:", file=out)
+    print("       ollama pull deepseek-ocr", file=out)
     return False
 
 
-def check_paddleocr():
-    """Check if PaddleOCR is installed (for fast mode)."""
-    try:
-        import paddleocr
-        version = getattr(paddleocr, '__version__', 'installed')
-        print(f"[OK] PaddleOCR installed: {version} (for fast mode)")
-        return True
-    except ImportError:
-        print("[WARN] PaddleOCR not found (fast mode unavailable)")
-        print("       Install with: pip install paddleocr paddlepaddle")
-        return None  # Warning, not failure
+_dist_lock = threading.Lock()
+
+@functools.lru_cache(maxsize=1)
+def _installed_versions():
+    versions = {}
+    for dist in metadata.distributions():
+        name = dist.metadata["Name"]
+        if name:
+            # First match wins, like metadata.version() on sys.path order
+            versions.setdefault(re.sub(r"[-_.]+", "-", name).lower(), dist.version)
+    return versions
+
 
+def dist_version(name):
+    """Installed version of a distribution, or None.
 
-def check_requests():
-    """Check if requests is installed."""
+    Every check looks packages up here: one pass over site-packages
+    instead of a metadata search (or a module import) per package.
+    """
+    with _dist_lock:  # Checks run in parallel; build the map only once
+        versions = _installed_versions()
+    return versions.get(re.sub(r"[-_.]+", "-", name).lower())
+
+
+def check_package(label, dists, install, purpose=None, out=None):
+    """Check that one of `dists` is installed.
+
+    Packages with a `purpose` are optional: missing is a warning, not a failure.
+    """
+    for dist in dists:
+        version = dist_version(dist)
+        if version:
+            note = f" (for {purpose})" if purpose else ""
+            print(f"[OK] {label} installed: {version}{note}", file=out)
+            return True
+    if purpose is None:
+        print(f"[FAIL] {label} not found. Install with: {install}", file=out)
+        return False
+    print(f"[WARN] {label} not found ({purpose} unavailable)", file=out)
+    print(f"       Install with: {install}", file=out)
+    return None
+
+
+# (check name, label, distributions, install command, optional purpose)
+_PKGS = [
+    ("Python requests", "requests", ("requests",), "pip install requests", None),
+    ("PaddleOCR", "PaddleOCR", ("paddleocr",), "pip install paddleocr paddlepaddle", "fast mode"),
+    ("PaddlePaddle", "PaddlePaddle", ("paddlepaddle-gpu", "paddlepaddle"), "pip install paddlepaddle",
+     "fast mode"),
+    ("pdf2image", "pdf2image", ("pdf2image",), "pip install pdf2image", "PDF support"),
+]
+PACKAGE_CHECKS = {
+    name: functools.partial(check_package, label, dists, install, purpose)
+    for name, label, dists, install, purpose in _PKGS
+}
+
+
+def check_model_cache(out=None):
+    """Check if PaddleOCR models are already downloaded."""
+    cache_dir = os.path.join(
+        os.environ.get("PADDLE_PDX_CACHE_HOME", os.path.expanduser("~/.paddlex")), "official_models"
+    )
     try:
-        import requests
-        print(f"[OK] requests installed")
+        # scandir's DirEntry avoids a stat() per entry; no list is built
+        with os.scandir(cache_dir) as it:
+            count = sum(1 for e in it if not e.name.startswith('.'))
+    except FileNotFoundError:
+        count = 0
+    if count:
+        print(f"[OK] Model cache found: {cache_dir}", file=out)
+        print(f"     {count} model(s) cached", file=out)
         return True
-    except ImportError:
-        print("[FAIL] requests not found. Install with: pip install requests")
-        return False
+    print("[INFO] No PaddleOCR models cached yet (downloaded on first --fast run)", file=out)
+    return None
+
+
+def check_hpi_backends(out=None):
+    """Check for inference backends used by PaddleOCR high-performance mode (--hpi)."""
+    backends = [f"{label} {dist_version(dist)}"
+                for dist, label in (("onnxruntime", "ONNXRuntime"), ("onnxruntime-gpu", "ONNXRuntime GPU"),
+                                    ("openvino", "OpenVINO"))
+                if dist_version(dist)]
+    if backends:
+        print(f"[OK] HPI backends available: {', '.join(backends)} (for --hpi)", file=out)
+        return True
+    print("[WARN] No HPI backend found (--hpi will fall back to Paddle Inference)", file=out)
+    print("       Install with: paddleocr install_hpi_deps cpu", file=out)
+    print("       or: pip install onnxruntime openvino", file=out)
+    return None
+
+
+def check_gpu(out=None):
+    """Report which device PaddleOCR fast mode will use."""
+    if not dist_version("paddlepaddle-gpu"):
+        # CPU-only build (or none): no need to pay for importing paddle
+        if dist_version("paddlepaddle"):
+            print("[INFO] CPU build of PaddlePaddle (fast mode uses CPU)", file=out)
+        else:
+            print("[INFO] PaddlePaddle not found, cannot detect GPU", file=out)
+        return None
+
+    import paddle
+    if paddle.device.is_compiled_with_cuda() and paddle.device.cuda.device_count() > 0:
+        cuda_version = paddle.version.cuda()
+        count = paddle.device.cuda.device_count()
+        print(f"[OK] GPU detected: {count} device(s), CUDA {cuda_version} (fast mode uses GPU)", file=out)
+        return True
+    print("[INFO] No CUDA GPU detected (fast mode uses CPU)", file=out)
+    return None
 
 
-def check_pdf2image():
-    """Check if pdf2image is installed."""
+def check_pybase64(out=None):
+    """Check if pybase64 (SIMD base64 for smart mode) is installed."""
     try:
-        import pdf2image
-        version = getattr(pdf2image, '__version__', 'installed')
-        print(f"[OK] pdf2image installed: {version}")
+        import pybase64
+        # e.g. "1.4.0 (C extension active - AVX2)"
+        print(f"[OK] pybase64 installed: {pybase64.get_version()}", file=out)
         return True
     except ImportError:
-        print("[WARN] pdf2image not found (PDF support unavailable)")
-        print("       Install with: pip install pdf2image")
+        print("[WARN] pybase64 not found (using slower stdlib base64)", file=out)
+        print("       Install with: pip install pybase64", file=out)
         return None
 
 
-def check_poppler():
+def check_poppler(proc, out=None):
     """Check if poppler is installed for PDF support."""
-    try:
-        result = subprocess.run(
-            ["pdftoppm", "-v"],
-            capture_output=True,
-            text=True
-        )
-        version = result.stderr.strip() if result.stderr else "installed"
-        print(f"[OK] Poppler installed: {version}")
+    output = collect(proc)
+    if output is not None:
+        version = output[1].strip() or "installed"
+        print(f"[OK] Poppler installed: {version}", file=out)
         return True
-    except FileNotFoundError:
-        print("[WARN] Poppler not found (PDF support unavailable)")
-        print("       Install with: brew install poppler")
-        return None
+    print("[WARN] Poppler not found (PDF support unavailable)", file=out)
+    print("       Install with: brew install poppler", file=out)
+    return None
+
+
+# 200x50 grayscale PNG reading "Hello OCR Test", precomputed so the OCR
+# tests don't need PIL to draw and encode it on every run
+_TEST_PNG = base64.b85decode(
+    'iBL{Q4GJ0x0000DNk~Le0002U0000o2mk;806aR&JpcdzyGcYrRCwC$*Gmq-AP7ZK_P^<N(1'
+    '9R*qKPBDos{@NPeY8g=a9#M009C72oNAZfB*pk1jsgsS$zAR*5+fG)Y_;PoB8&Bbd|SS^)5('
+    'kD^t2WDqh_tkXRlHqDm!ie*Qz{vi$OtrFSI6Pt=Q#`o<8woxhxM<WgxJ1Mx}XvU?zUJAE<b@'
+    '&-~LzblXy&y`m08_m7}qOKV_p1Go|9l!nIFg}1!gz!HC1PBlyK!5-'
+    'N0t5&UAXh_P$>MQ|9SVsg00000NkvXXu0mjf'
+)
 
 
 def test_deepseek_ocr():
@@ -116,51 +303,49 @@ def test_deepseek_ocr():
     print("\n--- Quick DeepSeek-OCR Test ---")
     try:
         import requests
-        import base64
-        import io
-        from PIL import Image, ImageDraw
-
-        # Create a simple test image
-        img = Image.new('RGB', (200, 50), color='white')
-        draw = ImageDraw.Draw(img)
-        draw.text((10, 10), "Hello OCR Test", fill='black')
 
-        # Save to bytes
-        img_bytes = io.BytesIO()
-        img.save(img_bytes, format='PNG')
-        img_base64 = base64.b64encode(img_bytes.getvalue()).decode('utf-8')
+        # Ollama only takes images as base64 in the JSON body (no multipart);
+        # the PNG is encoded once, straight from the literal
+        img_base64 = base64.b64encode(_TEST_PNG).decode('ascii')
 
-        # Call DeepSeek-OCR
+        # Call DeepSeek-OCR, streamed: the first generated token proves it
+        # works. Closing the connection early makes Ollama stop generating
         print("Calling DeepSeek-OCR...", end=" ", flush=True)
-        response = requests.post(
+        with requests.post(
             "http://localhost:11434/api/chat",
-            json={
+            data=json_body({
                 "model": "deepseek-ocr",
                 "messages": [{
                     "role": "user",
                     "content": "Extract all text from this image.",
                     "images": [img_base64]
                 }],
-                "stream": False
-            },
+                "stream": True
+            }),
+            headers={"Content-Type": "application/json", "Connection": "close"},
+            stream=True,
             timeout=120
-        )
-
-        if response.status_code == 200:
-            result = response.json()
-            text = result.get("message", {}).get("content", "")
-            if text:
-                print("done")
-                print(f"[OK] DeepSeek-OCR test passed. Output: {text[:80]}...")
-                return True
-            else:
-                print("empty response")
-                print("[WARN] DeepSeek-OCR returned empty result")
+        ) as response:
+            if response.status_code != 200:
+                print(f"HTTP {response.status_code}")
+                print(f"[FAIL] DeepSeek-OCR test failed")
                 return False
-        else:
-            print(f"HTTP {response.status_code}")
-            print(f"[FAIL] DeepSeek-OCR test failed")
-            return False
+
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                if "error" in chunk:
+                    raise RuntimeError(chunk["error"])
+                text = chunk.get("message", {}).get("content", "")
+                if text.strip():
+                    print("done")
+                    print(f"[OK] DeepSeek-OCR test passed. First output: {text.strip()[:80]}")
+                    return True
+
+        print("empty response")
+        print("[WARN] DeepSeek-OCR returned empty result")
+        return False
 
     except ImportError as e:
         print(f"skipped (missing: {e})")
@@ -171,87 +356,254 @@ def test_deepseek_ocr():
         return False
 
 
-def main():
-    print("=" * 55)
-    print("OCR Skill Environment Check")
-    print("(DeepSeek-OCR + PaddleOCR Dual Mode)")
-    print("=" * 55)
-    print()
+def test_paddle_ocr():
+    """Quick test of PaddleOCR with the same fast preset as `ocr.py --fast`.
+
+    Fast mode is optional, so a failed or empty test is a warning (None).
+    """
+    print("\n--- Quick PaddleOCR Test ---")
+    try:
+        import cv2  # Installed with paddleocr
+        import numpy as np
+        sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+        import ocr
+
+        # Default fast-mode options, so no models beyond what --fast uses are downloaded
+        parser = argparse.ArgumentParser()
+        ocr.add_paddle_arguments(parser)
+        args = parser.parse_args([])
+
+        # Decode in memory; PaddleOCR takes the BGR array directly
+        img = cv2.imdecode(np.frombuffer(_TEST_PNG, np.uint8), cv2.IMREAD_COLOR)
+
+        print("Running PaddleOCR...", end=" ", flush=True)
+        text = ocr.ocr_with_paddle(img, args.lang, ocr.paddle_options_from_args(args)).strip()
+        if text:
+            print("done")
+            print(f"[OK] PaddleOCR test passed. Output: {text[:80]}")
+            return True
+        print("empty result")
+        print("[WARN] PaddleOCR returned empty result")
+        return None
+
+    except ImportError as e:
+        print(f"skipped (missing: {e})")
+        return None
+    except (Exception, SystemExit) as e:  # create_paddle_ocr exits on init errors
+        print(f"failed")
+        print(f"[WARN] PaddleOCR test failed: {e}")
+        return None
+
+
+# ============================================
+# Check Result Cache
+# ============================================
+
+CACHE_FILE = os.path.join(
+    os.environ.get("OCR_SKILL_CACHE", os.path.expanduser("~/.cache/ocr-skill")), "setup_check.json"
+)
+CACHE_TTL = 24 * 3600  # seconds
+
+
+def _binary_key(name):
+    path = shutil.which(name)
+    return [path, os.path.getmtime(path)] if path else None
 
-    print("--- Core Requirements (DeepSeek-OCR) ---")
-    checks_core = [
-        ("Ollama Installation", check_ollama),
-        ("Ollama Server", check_ollama_running),
-        ("DeepSeek-OCR Model", check_deepseek_model),
-        ("Python requests", check_requests),
-    ]
 
-    results_core = []
-    for name, check_fn in checks_core:
+def _dist_key(*dists):
+    return [sys.executable, os.path.getmtime(sys.executable)] + [dist_version(d) for d in dists]
+
+
+# Checks worth caching (subprocesses, heavy imports) and the signature of
+# what they depend on; a changed signature invalidates the entry
+CACHE_KEYS = {
+    "Ollama Installation": lambda: _binary_key("ollama"),
+    "Poppler": lambda: _binary_key("pdftoppm"),
+    "GPU": lambda: _dist_key("paddlepaddle", "paddlepaddle-gpu"),
+}
+
+
+def load_cache():
+    """Return cached check results still valid for the current environment."""
+    try:
+        with open(CACHE_FILE, encoding="utf-8") as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(cache, dict):
+        return {}  # Truncated or hand-edited file: treat as a miss
+    now = time.time()
+    valid = {}
+    for name, key_fn in CACHE_KEYS.items():
+        entry = cache.get(name)
         try:
-            result = check_fn()
-            results_core.append((name, result))
-        except Exception as e:
-            print(f"[ERROR] {name}: {e}")
-            results_core.append((name, False))
+            if (isinstance(entry, dict) and isinstance(entry.get("output"), str)
+                    and "result" in entry and now - entry["ts"] < CACHE_TTL
+                    and entry["key"] == key_fn()):
+                valid[name] = entry
+        except (KeyError, TypeError, OSError):
+            pass  # Malformed entry, or its signature can't be computed
+    return valid
+
+
+def save_cache(cached, ran):
+    """Keep still-valid entries and add passing results of cacheable checks that ran.
+
+    Failures are never cached, so they are re-checked on every run.
+    """
+    cache = dict(cached)
+    for name, (result, output) in ran.items():
+        if name in CACHE_KEYS and result is True:
+            cache[name] = {"ts": time.time(), "key": CACHE_KEYS[name](), "result": result, "output": output}
+    try:
+        os.makedirs(os.path.dirname(CACHE_FILE), exist_ok=True)
+        with open(CACHE_FILE, "w", encoding="utf-8") as f:
+            json.dump(cache, f)
+    except OSError:
+        pass
 
-    print()
-    print("--- Optional: Fast Mode (PaddleOCR) ---")
-    checks_optional = [
-        ("PaddleOCR", check_paddleocr),
+
+def check_sections(procs):
+    """(section header, [(name, check function)]) in display order."""
+    ollama = procs["ollama"]
+    return [
+        ("--- Core Requirements (DeepSeek-OCR) ---", [
+            ("Ollama Installation", lambda out=None: check_ollama(*ollama_output(ollama)[0], out=out)),
+            ("Ollama Server", check_ollama_running),
+            ("DeepSeek-OCR Model", lambda out=None: check_deepseek_model(*ollama_output(ollama)[1], out=out)),
+            ("Python requests", PACKAGE_CHECKS["Python requests"]),
+        ]),
+        ("--- Optional: Fast Mode (PaddleOCR) ---", [
+            ("PaddleOCR", PACKAGE_CHECKS["PaddleOCR"]),
+            ("PaddlePaddle", PACKAGE_CHECKS["PaddlePaddle"]),
+            ("Model Cache", check_model_cache),
+            ("HPI Backends", check_hpi_backends),
+            ("GPU", check_gpu),
+        ]),
+        ("--- Optional: PDF Support ---", [
+            ("pdf2image", PACKAGE_CHECKS["pdf2image"]),
+            ("Poppler", functools.partial(check_poppler, procs["poppler"])),
+        ]),
+        ("--- Optional: Speedups ---", [
+            ("pybase64", check_pybase64),
+        ]),
     ]
 
-    results_optional = []
-    for name, check_fn in checks_optional:
-        try:
-            result = check_fn()
-            results_optional.append((name, result))
-        except Exception as e:
-            print(f"[ERROR] {name}: {e}")
-            results_optional.append((name, False))
+CHECK_TIMEOUT = 30  # seconds, for all checks together
+
+
+def run_check(name, check_fn):
+    """Run one check with its output buffered, so parallel checks don't interleave."""
+    out = io.StringIO()
+    try:
+        result = check_fn(out=out)
+    except Exception as e:
+        print(f"[ERROR] {name}: {e}", file=out)
+        result = False
+    return result, out.getvalue()
+
+
+def run_checks(sections, cached=None):
+    """Run every check concurrently and print the output in section order.
+
+    The checks are dominated by subprocesses, HTTP and imports, which
+    release the GIL, so wall time is roughly that of the slowest check.
+    Checks found in `cached` replay their stored output instead of running.
+    A timeout fails a check in the first (core) section and only warns
+    elsewhere. Returns a list of (name, result) per section.
+    """
+    cached = cached or {}
+    checks = [(name, fn) for _, section in sections for name, fn in section if name not in cached]
+    executor = ThreadPoolExecutor(max_workers=max(1, len(checks)))
+    futures = {name: executor.submit(run_check, name, fn) for name, fn in checks}
+    deadline = time.monotonic() + CHECK_TIMEOUT
+
+    ran = {}
+    section_results = []
+    for header, section in sections:
+        core = not section_results  # Only the first section is required
+        if section_results:
+            print()
+        print(header)
+        results = []
+        for name, _ in section:
+            if name in cached:
+                result, output = cached[name]["result"], cached[name]["output"]
+            else:
+                try:
+                    result, output = futures[name].result(timeout=max(0, deadline - time.monotonic()))
+                except FutureTimeoutError:
+                    # A slow optional probe must not fail an otherwise working setup
+                    if core:
+                        result, output = False, f"[ERROR] {name}: timed out after {CHECK_TIMEOUT}s\n"
+                    else:
+                        result, output = None, f"[WARN] {name}: timed out after {CHECK_TIMEOUT}s\n"
+                ran[name] = (result, output)
+            print(output, end="")
+            results.append((name, result))
+        section_results.append(results)
+    executor.shutdown(wait=False)  # Don't block on a timed-out check
+    save_cache(cached, ran)
+    return section_results
 
+
+def main():
+    parser = argparse.ArgumentParser(description="Check OCR Skill environment setup")
+    parser.add_argument("--force", action="store_true",
+                        help="Re-run every check, ignoring cached results")
+    parser.add_argument("--paddle-test", action="store_true",
+                        help="Also run a PaddleOCR test (loads the fast-mode models, takes seconds)")
+    args = parser.parse_args()
+
+    print("=" * 55)
+    print("OCR Skill Environment Check")
+    print("(DeepSeek-OCR + PaddleOCR Dual Mode)")
+    print("=" * 55)
     print()
-    print("--- Optional: PDF Support ---")
-    checks_pdf = [
-        ("pdf2image", check_pdf2image),
-        ("Poppler", check_poppler),
-    ]
 
-    results_pdf = []
-    for name, check_fn in checks_pdf:
-        try:
-            result = check_fn()
-            results_pdf.append((name, result))
-        except Exception as e:
-            print(f"[ERROR] {name}: {e}")
-            results_pdf.append((name, False))
+    cached = {} if args.force else load_cache()
+    if cached:
+        print(f"Using cached results for {len(cached)} check(s) (--force to re-run)")
+        print()
+    procs = spawn_external_checks(cached)
+    section_results = run_checks(check_sections(procs), cached)
+    results_core = section_results[0]
 
     # Run DeepSeek-OCR test if all core checks passed
-    all_results = results_core + results_optional + results_pdf
+    all_results = [r for results in section_results for r in results]
     core_passed = all(r is True for _, r in results_core)
 
     if core_passed:
         test_result = test_deepseek_ocr()
         all_results.append(("DeepSeek-OCR Test", test_result))
 
+    # Run PaddleOCR test on request, and only if fast mode is fully
+    # installed; a paddle init that is bound to fail would just cost seconds
+    results = dict(all_results)
+    if args.paddle_test and results.get("PaddleOCR") is True:
+        if results.get("PaddlePaddle") is True:
+            test_result = test_paddle_ocr()
+        else:
+            print("\n--- Quick PaddleOCR Test ---")
+            print("skipped (PaddlePaddle not installed)")
+            test_result = None
+        all_results.append(("PaddleOCR Test", test_result))
+
     # Summary
     print()
     print("=" * 55)
     print("Summary")
     print("=" * 55)
 
-    passed = sum(1 for _, r in all_results if r is True)
-    failed = sum(1 for _, r in all_results if r is False)
-    warnings = sum(1 for _, r in all_results if r is None)
-
+    # One pass: count results and build the status lines together
+    counts = Counter()
+    lines = []
     for name, result in all_results:
-        if result is True:
-            status = "PASS"
-        elif result is False:
-            status = "FAIL"
-        else:
-            status = "WARN"
-        print(f"  {name}: {status}")
+        counts[result] += 1
+        status = "PASS" if result is True else "FAIL" if result is False else "WARN"
+        lines.append(f"  {name}: {status}")
+    print("\n".join(lines))
+    failed = counts[False]
 
     print()
     if failed == 0:
@@ -268,4 +620,9 @@ def main():
 
 
 if __name__ == "__main__":
-    sys.exit(main())
+    code = main()
+    # Everything is printed and the cache file is closed: skip interpreter
+    # shutdown (paddle's finalizers, joining a timed-out check's thread)
+    sys.stdout.flush()
+    sys.stderr.flush()
+    os._exit(code)